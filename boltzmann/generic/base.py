@@ -216,7 +216,7 @@ def async_update(update_with_masks: UpdateWithMasks,
 
   def get_mask(pre_mask: tf.Tensor, iter_step: int) -> tf.Tensor:
     mask_ratio = 1 - (1 - sync_ratio) ** iter_step
-    mask = tf.where(random(pre_mask.shape, seed) < mask_ratio, 1., 0.)
+    mask = tf.cast(random(pre_mask.shape, seed) < mask_ratio, pre_mask.dtype)
     mask = tf.where(pre_mask > 0, pre_mask, mask)
     return mask
 
@@ -1,3 +1,4 @@
+import numpy as np
 import tensorflow as tf
 from typing import Optional
 
@@ -21,14 +22,12 @@ class Bernoulli(Distribution):
     self.prob = prob
 
   def sample(self, seed: int):
-    rand = random(self.prob.shape, seed)
-    y = tf.where(rand <= self.prob, 1, 0)
-    return tf.cast(y, self.prob.dtype)
+    rand = random(tf.shape(self.prob), seed, dtype=self.prob.dtype)
+    return tf.cast(rand <= self.prob, self.prob.dtype)
 
   @property
   def prob_argmax(self):
-    y = tf.where(self.prob >= 0.5, 1, 0)
-    return tf.cast(y, self.prob.dtype)
+    return tf.cast(self.prob >= 0.5, self.prob.dtype)
 
 
 class HintonInitializer(Initializer):
@@ -47,13 +46,9 @@ class HintonInitializer(Initializer):
 
   @property
   def ambient_bias(self):
-    p = expect(self.samples)
-
-    def initializer(_, dtype):
-      b = tf.math.log(p + self.eps) - tf.math.log(1 - p + self.eps)
-      return tf.cast(b, dtype)
-
-    return initializer
+    p = expect(tf.cast(self.samples, 'float32')).numpy()
+    b = np.log(p + self.eps) - np.log(1 - p + self.eps)
+    return tf.constant_initializer(b)
 
   @property
   def latent_latent_kernel(self):
@@ -207,7 +202,7 @@ def gibbs_sampling_with_masks(bm: BernoulliBoltzmannMachine,
 
   # get ambient given state
   new_v = Bernoulli(
-      tf.sigmoid(h @ tf.transpose(W) + v @ L + bv)
+      tf.sigmoid(tf.matmul(h, W, transpose_b=True) + v @ L + bv)
   ).sample(bm.seed)
   v = update_with_mask(new_v, v, ambient_mask)
 
@@ -234,7 +229,7 @@ def activate_with_masks(bm: BernoulliBoltzmannMachine,
 
   # get ambient given state
   new_v = Bernoulli(
-      tf.sigmoid(h @ tf.transpose(W) + v @ L + bv)
+      tf.sigmoid(tf.matmul(h, W, transpose_b=True) + v @ L + bv)
   ).prob_argmax
   v = update_with_mask(new_v, v, ambient_mask)
 
@@ -309,7 +304,7 @@ class LogInternalInformation(Callback):
     def stats(x, name):
       mean, var = tf.nn.moments(x, axes=range(len(x.shape)))
       std = tf.sqrt(var)
-      self.history.log(step, f'{name}', f'{mean:.5f} ({std:.5f})')
+      self.history.log(step, f'{name}', (mean, std))
 
     real_latent = (
         self.bm.get_latent_given_ambient(real_ambient)
@@ -329,7 +324,8 @@ def get_reconstruction_error(bm: BernoulliBoltzmannMachine,
                              ambient: tf.Tensor):
 
   def norm(x: tf.Tensor) -> float:
-    return tf.reduce_mean(tf.where(x != 0, 1., 0.))
+    return (tf.cast(tf.math.count_nonzero(x), 'float32')
+            / tf.cast(tf.size(x), 'float32'))
 
   return B.get_reconstruction_error(bm, ambient, norm)
 
@@ -2,9 +2,9 @@
 
 import abc
 import tensorflow as tf
-from typing import List
+from typing import List, Optional
 from copy import deepcopy
-from boltzmann.utils import History, inplace, expect, outer, quantize_tensor
+from boltzmann.utils import History, inplace, expect, quantize_tensor
 
 
 class Initializer(abc.ABC):
@@ -56,10 +56,11 @@ class RestrictedBoltzmannMachine(abc.ABC):
     return NotImplemented
 
 
+@tf.function(jit_compile=True)
 def relax(rbm: RestrictedBoltzmannMachine,
           ambient: tf.Tensor,
           max_step: int,
-          tolerance: float):
+          tolerance: Optional[float]):
   """Evolves the dynamics until the two adjacent ambients is the same, and
   returns the final ambient and the final step of evolution.
 
@@ -67,16 +68,37 @@ def relax(rbm: RestrictedBoltzmannMachine,
   evolution, regardless whether it has been relaxed or not.
 
   The word "same" means that the L-infinity norm of the difference is smaller
-  than the `tolerance`.
+  than the `tolerance`. If the `tolerance` is `None`, then evolves exactly
+  `max_step` steps without the check, unrolled at trace time. So keep the
+  `max_step` small in this case.
   """
-  step = 0
-  for _ in tf.range(max_step):
+
+  def evolve(ambient):
     latent = rbm.get_latent_given_ambient(ambient).prob_argmax
     new_ambient = rbm.get_ambient_given_latent(latent).prob_argmax
-    if infinity_norm(new_ambient - ambient) < tolerance:
-      break
-    ambient = new_ambient
-    step += 1
+    # The RBM may compute in another dtype than the ambient is given.
+    return tf.cast(new_ambient, ambient.dtype)
+
+  ambient = tf.convert_to_tensor(ambient)
+
+  if tolerance is None:
+    for _ in range(max_step):
+      ambient = evolve(ambient)
+    return ambient, tf.constant(max_step)
+
+  def cond(step, _, relaxed):
+    return tf.logical_and(step < max_step, tf.logical_not(relaxed))
+
+  def body(step, ambient, _):
+    new_ambient = evolve(ambient)
+    relaxed = infinity_norm(new_ambient - ambient) < tolerance
+    # Once relaxed, keeps the previous ambient and step.
+    step = tf.where(relaxed, step, step + 1)
+    ambient = tf.where(relaxed, ambient, new_ambient)
+    return step, ambient, relaxed
+
+  step, ambient, _ = tf.while_loop(
+      cond, body, (tf.constant(0), ambient, tf.constant(False)))
   return ambient, step
 
 
@@ -85,6 +107,7 @@ def infinity_norm(x: tf.Tensor):
   return norm
 
 
+@tf.function(jit_compile=True)
 def contrastive_divergence(rbm: RestrictedBoltzmannMachine,
                            fantasy_latent: tf.Tensor,
                            mc_steps: int):
@@ -95,17 +118,51 @@ def contrastive_divergence(rbm: RestrictedBoltzmannMachine,
   return fantasy_latent
 
 
+@tf.function(jit_compile=True)
+def contrastive_divergence_from_ambient(rbm: RestrictedBoltzmannMachine,
+                                        fantasy_ambient: tf.Tensor,
+                                        mc_steps: int):
+  """The same as `contrastive_divergence`, but starts from the fantasy ambient
+  that has been sampled from the fantasy latent, thus saves the first
+  ambient sampling. Returns the final fantasy latent.
+
+  The `mc_steps` shall be positive, since the given fantasy ambient has been
+  the first half step.
+  """
+  assert mc_steps >= 1
+  fantasy_latent = rbm.get_latent_given_ambient(fantasy_ambient).sample()
+  for _ in tf.range(mc_steps - 1):
+    fantasy_ambient = rbm.get_ambient_given_latent(fantasy_latent).sample()
+    fantasy_latent = rbm.get_latent_given_ambient(fantasy_ambient).sample()
+  return fantasy_latent
+
+
 def get_grads_and_vars(rbm: RestrictedBoltzmannMachine,
                        real_ambient: tf.Tensor,
-                       fantasy_latent: tf.Tensor):
-  """For applying `tf.optimizers.Optimizer.apply_gradients` method."""
+                       fantasy_latent: tf.Tensor,
+                       fantasy_ambient: Optional[tf.Tensor] = None):
+  """For applying `tf.optimizers.Optimizer.apply_gradients` method.
+
+  If the `fantasy_ambient` is `None`, then it is sampled from the
+  `fantasy_latent`.
+  """
   real_latent = rbm.get_latent_given_ambient(real_ambient).sample()
-  fantasy_ambient = rbm.get_ambient_given_latent(fantasy_latent).sample()
+  if fantasy_ambient is None:
+    fantasy_ambient = rbm.get_ambient_given_latent(fantasy_latent).sample()
+
+  # The samples may be in a lower compute dtype of the RBM, while the
+  # gradients are in the dtype of the variables.
+  real_ambient, real_latent, fantasy_ambient, fantasy_latent = (
+      tf.cast(x, rbm.kernel.dtype)
+      for x in (real_ambient, real_latent, fantasy_ambient, fantasy_latent))
 
+  # `expect(outer(x, y))` equals `x^T y / batch_size`, but without
+  # materializing the [batch_size, ambient_size, latent_size] tensor.
+  batch_size = tf.cast(tf.shape(real_ambient)[0], real_ambient.dtype)
   grad_kernel = (
-      expect(outer(fantasy_ambient, fantasy_latent))
-      - expect(outer(real_ambient, real_latent))
-  )
+      tf.matmul(fantasy_ambient, fantasy_latent, transpose_a=True)
+      - tf.matmul(real_ambient, real_latent, transpose_a=True)
+  ) / batch_size
   grad_latent_bias = expect(fantasy_latent) - expect(real_latent)
   grad_ambient_bias = expect(fantasy_ambient) - expect(real_ambient)
 
@@ -134,22 +191,79 @@ def train(rbm: RestrictedBoltzmannMachine,
           dataset: tf.data.Dataset,
           fantasy_latent: tf.Tensor,
           mc_steps: int = 1,
-          callbacks: List[Callback] = None):
-  """Returns the final fantasy latent."""
-  for step, real_ambient in enumerate(dataset):
-    grads_and_vars = get_grads_and_vars(rbm, real_ambient, fantasy_latent)
+          callbacks: List[Callback] = None,
+          steps_per_execution: int = 1):
+  """Returns the final fantasy latent.
+
+  The `dataset` may be stored in a narrower dtype, e.g. 'uint8' for binary
+  data, and is cast to the dtype of the kernel on device.
+
+  The `mc_steps` shall be positive, since the fantasy ambient sampled for the
+  gradients is reused as the first step of contrastive divergence.
+
+  If `steps_per_execution` is greater than one, then each element of the
+  `dataset` shall be a group of that many batches, i.e. grouped by the caller
+  via `dataset.batch(steps_per_execution)` after batching, with
+  `drop_remainder=True`, and before `prefetch` or `prefetch_to_device`. Each
+  group is trained in one call of a compiled function, and the callbacks are
+  called once per call, with the last step and the last batch of the call.
+  """
+  if callbacks is None:
+    callbacks = []
+
+  # Kept as a variable, s.t. the fantasy latent stays on device between steps.
+  fantasy_latent = tf.Variable(fantasy_latent, trainable=False)
+
+  if steps_per_execution == 1:
+    batch_spec = dataset.element_spec
+  else:
+    batch_spec = tf.TensorSpec(dataset.element_spec.shape[1:],
+                               dataset.element_spec.dtype)
+
+  # Traced once, on the shape of the batches, which is fully static if the
+  # `dataset` is batched with `drop_remainder=True`.
+  @tf.function(jit_compile=True, input_signature=[batch_spec])
+  def train_step(real_ambient: tf.Tensor):
+    real_ambient = tf.cast(real_ambient, rbm.kernel.dtype)
+    # Shared by the gradients and the first step of contrastive divergence.
+    fantasy_ambient = rbm.get_ambient_given_latent(fantasy_latent).sample()
+    grads_and_vars = get_grads_and_vars(
+        rbm, real_ambient, fantasy_latent, fantasy_ambient)
     optimizer.apply_gradients(grads_and_vars)
-    fantasy_latent = contrastive_divergence(rbm, fantasy_latent, mc_steps)
+    fantasy_latent.assign(
+        contrastive_divergence_from_ambient(rbm, fantasy_ambient, mc_steps))
+
+  if steps_per_execution == 1:
+    for step, real_ambient in enumerate(dataset):
+      train_step(real_ambient)
+
+      for callback in callbacks:
+        callback(step, real_ambient, fantasy_latent.read_value())
+
+    return tf.convert_to_tensor(fantasy_latent)
+
+  # If the groups are not batched with `drop_remainder=True`, then the number
+  # of batches in a call is unknown to the signature, since the last group may
+  # be short, and XLA compiles once more for the last call.
+  @tf.function(jit_compile=True, input_signature=[dataset.element_spec])
+  def train_steps(real_ambients: tf.Tensor):
+    for real_ambient in real_ambients:
+      train_step(real_ambient)
+
+  step = -1
+  for real_ambients in dataset:
+    train_steps(real_ambients)
+    step += real_ambients.shape[0]
 
-    if callbacks is None:
-      callbacks = []
     for callback in callbacks:
-      callback(step, real_ambient, fantasy_latent)
+      callback(step, real_ambients[-1], fantasy_latent.read_value())
 
-  return fantasy_latent
+  return tf.convert_to_tensor(fantasy_latent)
 
 
 class LogInternalInformation(Callback):
+  """Logs once per `log_step` steps, i.e. on the calls that a multiple of
+  `log_step` is in the steps since the previous call."""
 
   def __init__(self,
                rbm: RestrictedBoltzmannMachine,
@@ -160,19 +274,23 @@ class LogInternalInformation(Callback):
     self.verbose = verbose
 
     self.history = History()
+    self._last_step = -1
 
   def __call__(self,
                step: int,
                real_ambient: tf.Tensor,
                fantasy_latent: tf.Tensor):
-    if step % self.log_step != 0:
+    last_step, self._last_step = self._last_step, step
+    if step // self.log_step == last_step // self.log_step:
       return
 
     def stats(x, name):
+      x = tf.cast(x, 'float32')
       mean, var = tf.nn.moments(x, axes=range(len(x.shape)))
       std = tf.sqrt(var)
-      self.history.log(step, f'{name}', f'{mean:.5f} ({std:.5f})')
+      self.history.log(step, f'{name}', (mean, std))
 
+    real_ambient = tf.cast(real_ambient, self.rbm.kernel.dtype)
     real_latent = self.rbm.get_latent_given_ambient(real_ambient).prob_argmax
     stats(real_latent, 'real latent')
     stats(self.rbm.kernel, 'kernel')
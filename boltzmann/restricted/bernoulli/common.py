@@ -1,5 +1,6 @@
 """Common part of the Bernoulli restricted Boltzmann machines."""
 
+import numpy as np
 import tensorflow as tf
 from boltzmann.utils import expect, random
 from boltzmann.restricted.base import Initializer, Distribution
@@ -23,13 +24,9 @@ class HintonInitializer(Initializer):
   @property
   def ambient_bias(self):
     """C.f. Hinton (2012)."""
-    p = expect(self.samples)
-
-    def initializer(_, dtype):
-      b = tf.math.log(p + self.eps) - tf.math.log(1 - p + self.eps)
-      return tf.cast(b, dtype)
-
-    return initializer
+    p = expect(tf.cast(self.samples, 'float32')).numpy()
+    b = np.log(p + self.eps) - np.log(1 - p + self.eps)
+    return tf.constant_initializer(b)
 
   @property
   def latent_bias(self):
@@ -38,16 +35,41 @@ class HintonInitializer(Initializer):
 
 
 class Bernoulli(Distribution):
+  """Parameterized by either the probability `prob` or the `logits`.
+
+  Given the logits, sampling and argmax skip the sigmoid, since
+  `rand < sigmoid(logits)` if and only if `logit(rand) < logits`.
+  """
 
-  def __init__(self, prob: tf.Tensor):
-    self.prob = prob
+  def __init__(self, prob: tf.Tensor = None, logits: tf.Tensor = None):
+    if (prob is None) == (logits is None):
+      raise ValueError('Exactly one of `prob` and `logits` shall be given.')
+    self._prob = prob
+    self.logits = logits
+
+  @property
+  def prob(self) -> tf.Tensor:
+    if self._prob is None:
+      return tf.sigmoid(self.logits)
+    return self._prob
 
   def sample(self, seed: int = None) -> tf.Tensor:
-    rand = random(self.prob.shape, seed=seed)
-    y = tf.where(rand <= self.prob, 1, 0)
-    return tf.cast(y, self.prob.dtype)
+    """If the `seed` is `None`, then draws from the TF global generator, whose
+    state lives on device, s.t. sampling inside the compiled functions needs
+    no host-side seeding op per call. Otherwise draws by the op-level `seed`."""
+    param = self._prob if self.logits is None else self.logits
+    shape, dtype = tf.shape(param), param.dtype
+    if seed is None:
+      rand = tf.random.get_global_generator().uniform(shape, dtype=dtype)
+    else:
+      rand = random(shape, seed, dtype=dtype)
+    if self.logits is None:
+      return tf.cast(rand < self._prob, dtype)
+    return tf.cast(tf.math.log(rand) - tf.math.log1p(-rand) < self.logits,
+                   dtype)
 
   @property
   def prob_argmax(self) -> tf.Tensor:
-    y = tf.where(self.prob >= 0.5, 1, 0)
-    return tf.cast(y, self.prob.dtype)
+    if self.logits is None:
+      return tf.cast(self._prob >= 0.5, self._prob.dtype)
+    return tf.cast(self.logits >= 0, self.logits.dtype)
@@ -9,24 +9,34 @@ from boltzmann.restricted.bernoulli.common import Bernoulli
 
 
 class DenseBernoulliRBM(RestrictedBoltzmannMachine):
+  """Dense Bernoulli restricted Boltzmann machine.
+
+  The variables are kept in float32, and are cast to the `compute_dtype` in
+  computing the conditional distributions, e.g. 'bfloat16' on the hardware
+  that natively supports it. The ambient and latent are in the `compute_dtype`
+  too.
+  """
 
   def __init__(self,
                ambient_size: int,
                latent_size: int,
                initializer: Initializer,
                sparsity: float = 0,
-               seed: int = None):
+               seed: int = None,
+               compute_dtype: str = 'float32'):
     self.ambient_size = ambient_size
     self.latent_size = latent_size
     self.initializer = initializer
     self.sparsity = sparsity
     self.seed = seed
+    self.compute_dtype = compute_dtype
 
     self._kernel = create_variable(
         name='kernel',
         shape=[ambient_size, latent_size],
         initializer=self.initializer.kernel,
-        constraint=SparsityConstraint(sparsity, seed),
+        constraint=SparsityConstraint(
+            sparsity, seed, [ambient_size, latent_size]),
     )
     self._latent_bias = create_variable(
         name='latent_bias',
@@ -51,35 +61,42 @@ class DenseBernoulliRBM(RestrictedBoltzmannMachine):
   def latent_bias(self):
     return self._latent_bias
 
+  def cast(self, *tensors: tf.Tensor):
+    """Casts the `tensors` to the compute dtype."""
+    return [tf.cast(x, self.compute_dtype) for x in tensors]
+
   def get_latent_given_ambient(self, ambient: tf.Tensor):
-    W, b, x = self.kernel, self.latent_bias, ambient
-    a = x @ W + b
-    return Bernoulli(tf.sigmoid(a))
+    W, b, x = self.cast(self.kernel, self.latent_bias, ambient)
+    a = tf.nn.bias_add(x @ W, b)
+    return Bernoulli(logits=a)
 
   def get_ambient_given_latent(self, latent: tf.Tensor):
-    W, v, h = self.kernel, self.ambient_bias, latent
-    a = h @ tf.transpose(W) + v
-    return Bernoulli(tf.sigmoid(a))
+    W, v, h = self.cast(self.kernel, self.ambient_bias, latent)
+    a = tf.nn.bias_add(tf.matmul(h, W, transpose_b=True), v)
+    return Bernoulli(logits=a)
 
 
 def get_energy(rbm: DenseBernoulliRBM,
                ambient: tf.Tensor,
                latent: tf.Tensor):
-  x, h = ambient, latent
+  # Reduced in the dtype of the variables, rather than the compute dtype.
+  x, h = tf.cast(ambient, rbm.kernel.dtype), tf.cast(latent, rbm.kernel.dtype)
   W, b, v = rbm.kernel, rbm.latent_bias, rbm.ambient_bias
   energy: tf.Tensor = (
-      - tf.reduce_sum(x @ W * h, axis=-1)
-      - tf.reduce_mean(h * b, axis=-1)
-      - tf.reduce_mean(x * v, axis=-1)
+      - tf.einsum('bi,ij,bj->b', x, W, h)
+      - tf.linalg.matvec(h, b)
+      - tf.linalg.matvec(x, v)
   )
   return energy
 
 
 def get_free_energy(rbm: DenseBernoulliRBM, ambient: tf.Tensor):
-  W, b, v, x = rbm.kernel, rbm.latent_bias, rbm.ambient_bias, ambient
+  # Reduced in the dtype of the variables, rather than the compute dtype.
+  x = tf.cast(ambient, rbm.kernel.dtype)
+  W, b, v = rbm.kernel, rbm.latent_bias, rbm.ambient_bias
   free_energy: tf.Tensor = (
       -inner(v, x)
-      - tf.reduce_sum(tf.math.softplus(x @ W + b), axis=-1)
+      - tf.reduce_sum(tf.math.softplus(tf.nn.bias_add(x @ W, b)), axis=-1)
   )
   return free_energy
 
@@ -87,8 +104,9 @@ def get_free_energy(rbm: DenseBernoulliRBM, ambient: tf.Tensor):
 def initialize_fantasy_latent(latent_size: int,
                               num_samples: int,
                               prob: float = 0.5,
-                              seed: int = None):
-  p = prob * tf.ones([num_samples, latent_size])
+                              seed: int = None,
+                              dtype: str = 'float32'):
+  p = prob * tf.ones([num_samples, latent_size], dtype)
   return Bernoulli(p).sample(seed=seed)
 
 
@@ -101,11 +119,11 @@ class LatentIncrementingInitializer(Initializer):
   @property
   def kernel(self):
 
-    def initializer(*_):
+    def initializer(_, dtype):
       return tf.concat(
           [
               self.base_rbm.kernel,
-              tf.zeros([self.base_rbm.ambient_size, self.increment]),
+              tf.zeros([self.base_rbm.ambient_size, self.increment], dtype),
           ],
           axis=1)
 
@@ -122,11 +140,11 @@ class LatentIncrementingInitializer(Initializer):
   @property
   def latent_bias(self):
 
-    def initializer(*_):
+    def initializer(_, dtype):
       return tf.concat(
           [
               self.base_rbm.latent_bias,
-              tf.zeros([self.increment]),
+              tf.zeros([self.increment], dtype),
           ],
           axis=0)
 
@@ -146,20 +164,27 @@ def enlarge_latent(base_rbm: RestrictedBoltzmannMachine,
       ambient_size=base_rbm.ambient_size,
       latent_size=(base_rbm.latent_size + increment),
       initializer=LatentIncrementingInitializer(base_rbm, increment),
-      seed=seed)
+      seed=seed,
+      compute_dtype=base_rbm.compute_dtype)
   fantasy_latent = tf.concat(
       [
           base_fantasy_latent,
           initialize_fantasy_latent(
-              increment, base_fantasy_latent.shape[0], prob=0.5, seed=seed),
+              increment, base_fantasy_latent.shape[0], prob=0.5, seed=seed,
+              dtype=base_rbm.compute_dtype),
       ],
       axis=1)
   return rbm, fantasy_latent
 
 
+@tf.function
 def get_reconstruction_error(rbm: DenseBernoulliRBM, real_ambient: tf.Tensor):
+  """Returns the ratio of the ambient units that are wrongly reconstructed."""
+  real_ambient, = rbm.cast(real_ambient)
   real_latent = rbm.get_latent_given_ambient(real_ambient).prob_argmax
   recon_ambient = rbm.get_ambient_given_latent(real_latent).prob_argmax
-  recon_error: tf.Tensor = tf.reduce_mean(
-      tf.cast(recon_ambient != real_ambient, 'float32'))
+  num_errors = tf.math.count_nonzero(recon_ambient != real_ambient)
+  recon_error: tf.Tensor = (
+      tf.cast(num_errors, 'float32')
+      / tf.cast(tf.size(real_ambient), 'float32'))
   return recon_error
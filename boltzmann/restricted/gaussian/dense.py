@@ -34,7 +34,8 @@ class DenseGaussianRBM(RestrictedBoltzmannMachine):
         name='kernel',
         shape=[ambient_size, latent_size],
         initializer=self.initializer.kernel,
-        constraint=SparsityConstraint(sparsity, seed),
+        constraint=SparsityConstraint(
+            sparsity, seed, [ambient_size, latent_size]),
     )
     self._latent_bias = create_variable(
         name='latent_bias',
@@ -61,12 +62,12 @@ class DenseGaussianRBM(RestrictedBoltzmannMachine):
 
   def get_latent_given_ambient(self, ambient: tf.Tensor):
     W, b, x = self.kernel, self.latent_bias, ambient
-    a = x @ W + b
-    return Bernoulli(tf.sigmoid(a))
+    a = tf.nn.bias_add(x @ W, b)
+    return Bernoulli(logits=a)
 
   def get_ambient_given_latent(self, latent: tf.Tensor):
     W, v, h = self.kernel, self.ambient_bias, latent
-    mean = h @ tf.transpose(W) + v
+    mean = tf.nn.bias_add(tf.matmul(h, W, transpose_b=True), v)
     stddev = tf.ones_like(mean)
     return Gaussian(mean, stddev)
 
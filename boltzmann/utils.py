@@ -58,8 +58,9 @@ def outer(x: tf.Tensor, y: tf.Tensor) -> tf.Tensor:
   return tf.expand_dims(x, axis=-1) * tf.expand_dims(y, axis=-2)
 
 
-def random(shape: List[int], seed: int) -> tf.Tensor:
-  return tf.random.uniform(shape=shape, minval=0., maxval=1., seed=seed)
+def random(shape: List[int], seed: int, dtype: str = 'float32') -> tf.Tensor:
+  return tf.random.uniform(
+      shape=shape, minval=0., maxval=1., dtype=dtype, seed=seed)
 
 
 def expect(x: tf.Tensor) -> tf.Tensor:
@@ -95,10 +96,16 @@ class History:
     self.logs = defaultdict(dict)
 
   def log(self, step: int, key: str, value: object):
-    try:  # maybe a tf.Tensor
-      value = value.numpy()
-    except AttributeError:
-      pass
+    """The `value`, maybe a tf.Tensor, is stored as a tensor, s.t. logging does
+    not wait for the device. It is converted to numpy only when shown.
+
+    A tf.Variable is stored as the tensor of its current value, since the
+    variable itself changes later.
+    """
+    if isinstance(value, tuple):
+      value = tuple(_snapshot(x) for x in value)
+    else:
+      value = _snapshot(value)
     self.logs[step][key] = value
 
   def show(self, step: int, keys: List[str] = None):
@@ -109,40 +116,55 @@ class History:
     aspects = []
     for k in keys:
       v = self.logs[step].get(k, None)
-      if isinstance(v, (float, np.floating)):
-        v = f'{v:.5f}'
-      elif isinstance(v, str):
-        pass
-      else:
-        raise ValueError(f'Type {type(v)} is temporally not supported.')
-      aspects.append(f'{k}: {v}')
+      aspects.append(f'{k}: {_format(v)}')
 
     show_str = ' - '.join([f'step: {step}'] + aspects)
     return show_str
 
 
+def _snapshot(value: object) -> object:
+  if isinstance(value, (tf.Tensor, tf.Variable)):
+    return tf.convert_to_tensor(value)
+  return value
+
+
+def _format(value: object) -> str:
+  """A pair, e.g. of mean and stddev, is formatted as "first (second)"."""
+  try:  # maybe a tf.Tensor
+    value = value.numpy()
+  except AttributeError:
+    pass
+
+  if isinstance(value, (float, np.floating)):
+    return f'{value:.5f}'
+  if isinstance(value, str):
+    return value
+  if isinstance(value, tuple) and len(value) == 2:
+    first, second = value
+    return f'{_format(first)} ({_format(second)})'
+  raise ValueError(f'Type {type(value)} is temporally not supported.')
+
+
 # TODO: Use this instead: https://stackoverflow.com/questions/37001686/using-sparsetensor-as-a-trainable-variable/37807830#37807830  # noqa: E501
 class SparsityConstraint(tf.keras.constraints.Constraint):
 
-  def __init__(self, sparsity: float, seed: int):
+  def __init__(self,
+               sparsity: float,
+               seed: int,
+               shape: List[int],
+               dtype: str = 'float32'):
     self.sparsity = sparsity
     self.seed = seed
 
-    self.mask = None
-    self.built = False
+    # Built eagerly, since the constraint may be first called within a traced
+    # function, e.g. by the optimizer, where the mask would not outlive it.
+    with tf.init_scope():
+      rand = random(shape=shape, seed=seed)
+      self.mask = tf.cast(rand > sparsity, dtype)
 
   def __call__(self, kernel: tf.Tensor):
-    if not self.built:
-      self.build(kernel.shape, kernel.dtype)
     return self.mask * kernel
 
-  def build(self, shape, dtype):
-    rand = random(shape=shape, seed=self.seed)
-    self.mask = tf.cast(
-        tf.where(rand > self.sparsity, 1, 0),
-        dtype)
-    self.built = True
-
 
 class SymmetricDiagonalVanishingConstraint(tf.keras.constraints.Constraint):
 